@@ -1,5 +1,6 @@
 from libcpp.string cimport string
 from libcpp cimport bool
+from libcpp.map cimport map
 
 cdef extern from "selfdrive/common/params.cc":
   pass
@@ -24,5 +25,8 @@ cdef extern from "selfdrive/common/params.h":
     int remove(string) nogil
     int put(string, string) nogil
     int putBool(string, bool) nogil
+    int putMany(map[string, string]) nogil
     bool checkKey(string) nogil
+    string getParamsPath() nogil
+    string getParamPath(string) nogil
     void clearAll(ParamKeyType)
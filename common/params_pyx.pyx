@@ -2,6 +2,7 @@
 # cython: language_level = 3
 from libcpp cimport bool
 from libcpp.string cimport string
+from libcpp.map cimport map
 from common.params_pxd cimport Params as c_Params, ParamKeyType as c_ParamKeyType
 
 import os
@@ -77,6 +78,10 @@ cdef class Params:
     else:
       return val
 
+  def get_param_path(self, key):
+    cdef string k = self.check_key(key)
+    return self.p.getParamPath(k).decode()
+
   def get_bool(self, key):
     cdef string k = self.check_key(key)
     cdef bool r
@@ -101,6 +106,24 @@ cdef class Params:
     with nogil:
       self.p.putBool(k, val)
 
+  def put_many(self, dat):
+    """
+    Writes all key/value pairs in the dict at once. Blocks like put(), but
+    the params lock is taken and the directory fsynced only once.
+    """
+    cdef map[string, string] values
+    cdef string k, v
+    for key, val in dat.items():
+      k = self.check_key(key)
+      v = ensure_bytes(val)
+      values[k] = v
+    with nogil:
+      self.p.putMany(values)
+
+  def get_keys(self):
+    # keys that currently have a value, from a single directory listing
+    return set(os.listdir(os.path.join(self.p.getParamsPath().decode(), "d")))
+
   def delete(self, key):
     cdef string k = self.check_key(key)
     with nogil:
@@ -0,0 +1,30 @@
+import os
+
+from common.params import Params
+
+
+class ParamWatcher:
+  """Caches bool params for loops that poll them every tick.
+
+  Params are written by renaming a fresh file into place, so a param only
+  needs to be read again when its (inode, mtime) changes.
+  """
+  def __init__(self, keys, params=None):
+    self.params = Params() if params is None else params
+    self.paths = {k: self.params.get_param_path(k) for k in keys}
+    self.stamps = {}
+    self.values = {}
+
+  def _stamp(self, key):
+    try:
+      st = os.stat(self.paths[key])
+    except FileNotFoundError:
+      return None
+    return st.st_ino, st.st_mtime_ns
+
+  def get_bool(self, key):
+    stamp = self._stamp(key)
+    if key not in self.values or stamp != self.stamps[key]:
+      self.stamps[key] = stamp
+      self.values[key] = self.params.get_bool(key)
+    return self.values[key]
@@ -1,3 +1,4 @@
+import os
 import threading
 import time
 import tempfile
@@ -54,6 +55,32 @@ class TestParams(unittest.TestCase):
     assert self.params.get("CarParams") is None
     assert self.params.get("CarParams", True) == b"test"
 
+  def test_params_get_param_path(self):
+    self.params.put("DongleId", "cb38263377b873ee")
+    path = self.params.get_param_path("DongleId")
+    assert path == os.path.join(self.tmpdir, "d", "DongleId")
+    with open(path, "rb") as f:
+      assert f.read() == b"cb38263377b873ee"
+
+  def test_params_put_many(self):
+    self.params.put_many({"DongleId": "bob", "AthenadPid": "123", "CarParams": b"\xe1\x90\xff"})
+    assert self.params.get("DongleId") == b"bob"
+    assert self.params.get("AthenadPid") == b"123"
+    assert self.params.get("CarParams") == b"\xe1\x90\xff"
+
+  def test_params_put_many_unknown_key_fails(self):
+    with self.assertRaises(UnknownKeyName):
+      self.params.put_many({"DongleId": "bob", "swag": "abc"})
+    assert self.params.get("DongleId") is None
+
+  def test_params_get_keys(self):
+    assert self.params.get_keys() == set()
+    self.params.put("DongleId", "bob")
+    self.params.put_bool("IsMetric", True)
+    assert self.params.get_keys() == {"DongleId", "IsMetric"}
+    self.params.delete("DongleId")
+    assert self.params.get_keys() == {"IsMetric"}
+
   def test_params_unknown_key_fails(self):
     with self.assertRaises(UnknownKeyName):
       self.params.get("swag")
@@ -0,0 +1,39 @@
+import tempfile
+import shutil
+import unittest
+
+from common.params import Params, UnknownKeyName
+from common.params_watcher import ParamWatcher
+
+class TestParamWatcher(unittest.TestCase):
+  def setUp(self):
+    self.tmpdir = tempfile.mkdtemp()
+    self.params = Params(self.tmpdir)
+    self.watcher = ParamWatcher(["IsDriverViewEnabled", "DoUninstall"], self.params)
+
+  def tearDown(self):
+    shutil.rmtree(self.tmpdir)
+
+  def test_missing_param(self):
+    assert not self.watcher.get_bool("DoUninstall")
+
+  def test_picks_up_writes(self):
+    assert not self.watcher.get_bool("IsDriverViewEnabled")
+    self.params.put_bool("IsDriverViewEnabled", True)
+    assert self.watcher.get_bool("IsDriverViewEnabled")
+    self.params.put_bool("IsDriverViewEnabled", False)
+    assert not self.watcher.get_bool("IsDriverViewEnabled")
+
+  def test_picks_up_delete(self):
+    self.params.put_bool("DoUninstall", True)
+    assert self.watcher.get_bool("DoUninstall")
+    self.params.delete("DoUninstall")
+    assert not self.watcher.get_bool("DoUninstall")
+
+  def test_unknown_key(self):
+    with self.assertRaises(UnknownKeyName):
+      ParamWatcher(["swag"], self.params)
+
+
+if __name__ == "__main__":
+  unittest.main()
@@ -1,5 +1,6 @@
 from cereal import car
 from common.params import Params
+from common.params_watcher import ParamWatcher
 from common.numpy_fast import mean, interp
 from common.realtime import sec_since_boot
 from selfdrive.config import Conversions as CV
@@ -31,6 +32,8 @@ class CarState(CarStateBase):
     can_define = CANDefine(DBC[CP.carFingerprint]["pt"])
     self.shifter_values = can_define.dv["ECMPRDNL"]["PRNDL"]
     self._params = Params()
+    # OnePedalMode is polled at 10Hz here and in CarInterface, only re-read it when it changes
+    self.param_watcher = ParamWatcher(["OnePedalMode"], self._params)
     
     with open("/data/fp_log.txt",'a') as f:
       f.write(f"{self.car_fingerprint}\n")
@@ -191,7 +194,7 @@ class CarState(CarStateBase):
       self.accel_mode = int(self._params.get("AccelMode", encoding="utf8"))  # 0 = normal, 1 = sport; 2 = eco; 3 = creep
       if not self.disengage_on_gas:
         self.one_pedal_pause_steering_enabled = self._params.get_bool("OnePedalPauseBlinkerSteering")
-        self.one_pedal_mode_enabled = self._params.get_bool("OnePedalMode")
+        self.one_pedal_mode_enabled = self.param_watcher.get_bool("OnePedalMode")
         self.one_pedal_mode_engage_on_gas_enabled = self._params.get_bool("OnePedalModeEngageOnGas") and (self.one_pedal_mode_enabled or not self.disengage_on_gas)
 
     self.angle_steers = pt_cp.vl["PSCMSteeringAngle"]['SteeringWheelAngle']
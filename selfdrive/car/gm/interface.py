@@ -1,13 +1,12 @@
 #!/usr/bin/env python3
+from functools import lru_cache
 from math import fabs, sin
 from cereal import car
-from common.numpy_fast import interp
-from common.realtime import sec_since_boot
-from common.params import Params
 from selfdrive.swaglog import cloudlog
 from selfdrive.config import Conversions as CV
 from selfdrive.car.gm.values import CAR, CruiseButtons, \
                                     AccState, CarControllerParams
+from selfdrive.car.gm.lookup_tables import Idx, interp_idx, interp_scalar
 from selfdrive.car import STD_CARGO_KG, scale_rot_inertia, scale_tire_stiffness, gen_empty_fingerprint
 from selfdrive.car.interfaces import CarInterfaceBase
 from selfdrive.controls.lib.longitudinal_planner import _A_CRUISE_MIN_V_SPORT, \
@@ -17,23 +16,15 @@ from selfdrive.controls.lib.longitudinal_planner import _A_CRUISE_MIN_V_SPORT, \
                                                         _A_CRUISE_MIN_BP, \
                                                         _A_CRUISE_MAX_V_CREEP, \
                                                         _A_CRUISE_MAX_V_ECO, \
-                                                        _A_CRUISE_MAX_V, \
                                                         _A_CRUISE_MAX_V_SPORT, \
                                                         _A_CRUISE_MAX_V_FOLLOWING, \
-                                                        _A_CRUISE_MAX_BP, \
                                                         _A_CRUISE_MIN_V_MODE_LIST, \
                                                         _A_CRUISE_MAX_V_MODE_LIST, \
                                                         calc_cruise_accel_limits
 
 FOLLOW_AGGRESSION = 0.15 # (Acceleration/Decel aggression) Lower is more aggressive
 
-# revert to stock max negative accel based on relative lead velocity
-_A_MIN_V_STOCK_FACTOR_BP = [-5. * CV.MPH_TO_MS, 1. * CV.MPH_TO_MS]
-_A_MIN_V_STOCK_FACTOR_V = [0., 1.]
-
 # increase/decrease max accel based on vehicle pitch
-INCLINE_ACCEL_SCALE_BP = [i * CV.MPH_TO_MS for i in [25., 45]] # [mph] lookup speeds for additional offset
-INCLINE_ACCEL_SCALE_V = [1.2, 1.05] # [m/s^2] additional scale factor to change how incline affects accel based on speed
 INCLINE_ACCEL_MAX_STOCK_FACTOR = 0.8 # acceleration will never be increased to more than this factor of the "stock" acceleration at the current speed
 DECLINE_ACCEL_FACTOR = 0.5 # this factor of g accel is used to lower max accel limit so you don't floor it downhill
 DECLINE_ACCEL_MIN = 0.2 # [m/s^2] don't decrease acceleration limit due to decline below this total value
@@ -41,58 +32,218 @@ DECLINE_ACCEL_MIN = 0.2 # [m/s^2] don't decrease acceleration limit due to decli
 ButtonType = car.CarState.ButtonEvent.Type
 EventName = car.CarEvent.EventName
 
+# scalar-only core of CarInterface.get_pid_accel_limits, free of any CarState lookups
+def _pid_accel_limits_core(current_speed, lead_v, lead_d, pitch, accel_mode, time_since_engage, ramp_bp, ramp_v, accel_min, accel_max):
+  has_lead = lead_d > 0.
+  following = has_lead and lead_d < 45.0 and lead_v > current_speed
+  lo, hi = calc_cruise_accel_limits(current_speed, following, accel_mode)
+
+  # decrease min accel as necessary based on lead conditions
+  if has_lead:
+    stock_min_factor = interp_idx(current_speed - lead_v, Idx.MIN_V_STOCK_FACTOR)
+    lo = stock_min_factor * accel_min + (1. - stock_min_factor) * lo
+
+  # decrease/increase max accel based on vehicle pitch
+  if pitch == 0.:
+    hi = max(DECLINE_ACCEL_MIN, hi)
+  else:
+    # sin(x) ~= x - x^3/6 is off by at most ~2e-5 below 0.3 rad, which covers any road grade
+    g_accel = 9.81 * (pitch - pitch * pitch * pitch / 6.) if -0.3 < pitch < 0.3 else 9.81 * sin(pitch)
+    if g_accel > 0.:
+      hi = max(hi, min(INCLINE_ACCEL_MAX_STOCK_FACTOR * interp_idx(current_speed, Idx.CRUISE_MAX), g_accel * interp_idx(current_speed, Idx.INCLINE_ACCEL_SCALE)))
+    else:
+      hi = max(DECLINE_ACCEL_MIN, hi + g_accel * DECLINE_ACCEL_FACTOR)
+
+  if time_since_engage < ramp_bp[-1]:
+    lo *= interp_scalar(time_since_engage, ramp_bp, ramp_v)
+
+  return [max(accel_min, lo), min(hi, accel_max)]
+
+# Volt determined by iteratively plotting and minimizing error for f(angle, speed) = steer.
+def get_steer_feedforward_volt(desired_angle, v_ego):
+  # maps [-inf,inf] to [-1,1]: sigmoid(34.4 deg) = sigmoid(1) = 0.5
+  # 1 / 0.02904609 = 34.4 deg ~= 36 deg ~= 1/10 circle? Arbitrary?
+  desired_angle *= 0.02904609
+  sigmoid = desired_angle / (1 + fabs(desired_angle))
+  return 0.10006696 * sigmoid * (v_ego + 3.12485927)
+
+def get_steer_feedforward_acadia(desired_angle, v_ego):
+  desired_angle *= 0.09760208
+  sigmoid = desired_angle / (1 + fabs(desired_angle))
+  return 0.04689655 * sigmoid * (v_ego + 10.028217)
+
+_VOLT_KDBP = tuple(i * CV.MPH_TO_MS for i in (15., 30., 55.))
+
+# per-car CarParams overrides; each returns the tire stiffness factor to use
+def _apply_volt(ret, tire_stiffness_factor):
+  # supports stop and go, but initial engage must be above 18mph (which include conservatism)
+  ret.minEnableSpeed = -1
+  ret.mass = 1607. + STD_CARGO_KG
+  ret.wheelbase = 2.69
+  ret.steerRatio = 17.7  # Stock 15.7, LiveParameters
+  ret.steerRateCost = 1.0
+  tire_stiffness_factor = 0.469 # Stock Michelin Energy Saver A/S, LiveParameters
+  ret.steerRatioRear = 0.
+  ret.centerToFront = 0.45 * ret.wheelbase # from Volt Gen 1
+
+  ret.lateralTuning.pid.kpBP = [0., 40.]
+  ret.lateralTuning.pid.kpV = [0.0, .20]
+  ret.lateralTuning.pid.kiBP = [0.0]
+  ret.lateralTuning.pid.kiV = [0.02]
+  ret.lateralTuning.pid.kdBP = _VOLT_KDBP
+  ret.lateralTuning.pid.kdV = [0.1, 0.25, 0.3]
+  ret.lateralTuning.pid.kf = 1. # !!! ONLY for sigmoid feedforward !!!
+  ret.steerActuatorDelay = 0.2
+
+  # Only tuned to reduce oscillations. TODO.
+  ret.longitudinalTuning.kpV = [1.7, 1.3]
+  ret.longitudinalTuning.kiV = [0.34]
+  ret.longitudinalTuning.kdV = [1.2, 0.2]
+  ret.longitudinalTuning.kdBP = [5., 25.]
+  return tire_stiffness_factor
+
+def _apply_malibu(ret, tire_stiffness_factor):
+  # supports stop and go, but initial engage must be above 18mph (which include conservatism)
+  ret.minEnableSpeed = 18 * CV.MPH_TO_MS
+  ret.mass = 1496. + STD_CARGO_KG
+  ret.wheelbase = 2.83
+  ret.steerRatio = 15.8
+  ret.steerRatioRear = 0.
+  ret.centerToFront = ret.wheelbase * 0.4  # wild guess
+  return tire_stiffness_factor
+
+def _apply_holden_astra(ret, tire_stiffness_factor):
+  ret.mass = 1363. + STD_CARGO_KG
+  ret.wheelbase = 2.662
+  # Remaining parameters copied from Volt for now
+  ret.centerToFront = ret.wheelbase * 0.4
+  ret.minEnableSpeed = 18 * CV.MPH_TO_MS
+  ret.steerRatio = 15.7
+  ret.steerRatioRear = 0.
+  return tire_stiffness_factor
+
+def _apply_acadia(ret, tire_stiffness_factor):
+  ret.minEnableSpeed = -1.  # engage speed is decided by pcm
+  ret.mass = 4353 * CV.LB_TO_KG + STD_CARGO_KG # from vin decoder
+  ret.wheelbase = 2.86 # Confirmed from vin decoder
+  ret.steerRatio = 14.4  # end to end is 13.46 - seems to be undocumented, using JYoung value
+  ret.steerRatioRear = 0.
+  ret.centerToFront = ret.wheelbase * 0.4
+  ret.lateralTuning.pid.kf = 1. # get_steer_feedforward_acadia()
+  ret.longitudinalTuning.kpV = [.19, .15]
+  return tire_stiffness_factor
+
+def _apply_buick_regal(ret, tire_stiffness_factor):
+  ret.minEnableSpeed = 18 * CV.MPH_TO_MS
+  ret.mass = 3779. * CV.LB_TO_KG + STD_CARGO_KG  # (3849+3708)/2
+  ret.wheelbase = 2.83  # 111.4 inches in meters
+  ret.steerRatio = 14.4  # guess for tourx
+  ret.steerRatioRear = 0.
+  ret.centerToFront = ret.wheelbase * 0.4  # guess for tourx
+  return tire_stiffness_factor
+
+def _apply_cadillac_ats(ret, tire_stiffness_factor):
+  ret.minEnableSpeed = 18 * CV.MPH_TO_MS
+  ret.mass = 1601. + STD_CARGO_KG
+  ret.wheelbase = 2.78
+  ret.steerRatio = 15.3
+  ret.steerRatioRear = 0.
+  ret.centerToFront = ret.wheelbase * 0.49
+  return tire_stiffness_factor
+
+def _apply_escalade(ret, tire_stiffness_factor):
+  ret.minEnableSpeed = -1.  # engage speed is decided by pcm
+  ret.mass = 2645. + STD_CARGO_KG
+  ret.wheelbase = 2.95
+  ret.steerRatio = 17.3  # end to end is 13.46
+  ret.steerRatioRear = 0.
+  ret.centerToFront = ret.wheelbase * 0.4
+  ret.lateralTuning.pid.kiBP, ret.lateralTuning.pid.kpBP = [[10., 41.0], [10., 41.0]]
+  ret.lateralTuning.pid.kpV, ret.lateralTuning.pid.kiV = [[0.13, 0.24], [0.01, 0.02]]
+  ret.lateralTuning.pid.kf = 0.000045
+  return 1.0  # tire stiffness factor
+
+def _apply_escalade_esv(ret, tire_stiffness_factor):
+  ret.minEnableSpeed = -1.  # engage speed is decided by pcm
+  ret.mass = 2739. + STD_CARGO_KG
+  ret.wheelbase = 3.302
+  ret.steerRatio = 17.3
+  ret.centerToFront = ret.wheelbase * 0.49
+  ret.lateralTuning.pid.kiBP, ret.lateralTuning.pid.kpBP = [[10., 41.0], [10., 41.0]]
+  ret.lateralTuning.pid.kpV, ret.lateralTuning.pid.kiV = [[0.13, 0.24], [0.01, 0.02]]
+  ret.lateralTuning.pid.kf = 0.000045
+  return 1.0  # tire stiffness factor
+
+# car-specific overrides applied on top of the GM defaults in get_params
+_CAR_PARAM_APPLIERS = {
+  CAR.VOLT: _apply_volt,
+  CAR.MALIBU: _apply_malibu,
+  CAR.HOLDEN_ASTRA: _apply_holden_astra,
+  CAR.ACADIA: _apply_acadia,
+  CAR.BUICK_REGAL: _apply_buick_regal,
+  CAR.CADILLAC_ATS: _apply_cadillac_ats,
+  CAR.ESCALADE: _apply_escalade,
+  CAR.ESCALADE_ESV: _apply_escalade_esv,
+}
+
+# CarParams only depend on the candidate and fingerprint, so build them once per pair.
+# Bounded so repeated fingerprinting runs can't grow it forever.
+@lru_cache(maxsize=32)
+def _get_params_cached(candidate, fingerprint_key):
+  fingerprint = {bus: dict(msgs) for bus, msgs in fingerprint_key}
+  return CarInterface._build_params(candidate, fingerprint).as_reader()
+
+_STEER_FEEDFORWARD_FUNCTIONS = {
+  CAR.VOLT: get_steer_feedforward_volt,
+  CAR.ACADIA: get_steer_feedforward_acadia,
+}
+
+# params the UI can also write; the file may have changed since our last write, so never skip these as duplicates
+_UI_WRITABLE_PARAMS = frozenset(["OnePedalMode"])
+
+# distance button state bits, combined into the key for CarInterface._DISTANCE_HANDLERS
+_DB_PRESSED = 1
+_DB_CHANGED = 2
+_DB_ONE_PEDAL = 4
+
 class CarInterface(CarInterfaceBase):
   params_check_last_t = 0.
   params_check_freq = 0.1 # check params at 10Hz
   params = CarControllerParams()
+  _ACCEL_MIN = params.ACCEL_MIN
+  _ACCEL_MAX = params.ACCEL_MAX
+
+  def __init__(self, CP, CarController, CarState):
+    super().__init__(CP, CarController, CarState)
+
+    # param writes from button handling are queued here and flushed once per tick
+    self._pending_params = {}
+    self._last_written = {}
+
+    self._steer_ff = _STEER_FEEDFORWARD_FUNCTIONS.get(CP.carFingerprint, CarInterfaceBase.get_steer_feedforward_default)
   
   @staticmethod
   def get_pid_accel_limits(CP, current_speed, cruise_speed, CI = None):
-    following = CI.CS.coasting_lead_d > 0. and CI.CS.coasting_lead_d < 45.0 and CI.CS.coasting_lead_v > current_speed
-    accel_limits = calc_cruise_accel_limits(current_speed, following, CI.CS.accel_mode)
-    
-    # decrease min accel as necessary based on lead conditions
-    stock_min_factor = interp(current_speed - CI.CS.coasting_lead_v, _A_MIN_V_STOCK_FACTOR_BP, _A_MIN_V_STOCK_FACTOR_V) if CI.CS.coasting_lead_d > 0. else 0.
-    accel_limits[0] = stock_min_factor * CI.params.ACCEL_MIN + (1. - stock_min_factor) * accel_limits[0]
-    
-    # decrease/increase max accel based on vehicle pitch
-    g_accel = 9.81 * sin(CI.CS.pitch)
-    if g_accel > 0.:
-      accel_limits[1] = max(accel_limits[1], min(INCLINE_ACCEL_MAX_STOCK_FACTOR * interp(current_speed, _A_CRUISE_MAX_BP, _A_CRUISE_MAX_V), g_accel * interp(current_speed, INCLINE_ACCEL_SCALE_BP, INCLINE_ACCEL_SCALE_V)))
-    else:
-      accel_limits[1] = max(DECLINE_ACCEL_MIN, accel_limits[1] + g_accel * DECLINE_ACCEL_FACTOR)
-    
-    time_since_engage = CI.CS.t - CI.CS.cruise_enabled_last_t
-    if time_since_engage < CI.CS.cruise_enabled_neg_accel_ramp_bp[-1]:
-      accel_limits[0] *= interp(time_since_engage, CI.CS.cruise_enabled_neg_accel_ramp_bp, CI.CS.cruise_enabled_neg_accel_ramp_v)
-      
-    return [max(CI.params.ACCEL_MIN, accel_limits[0]), min(accel_limits[1], CI.params.ACCEL_MAX)]
+    return _pid_accel_limits_core(current_speed, CI.CS.coasting_lead_v, CI.CS.coasting_lead_d, CI.CS.pitch, CI.CS.accel_mode,
+                                  CI.CS.t - CI.CS.cruise_enabled_last_t, CI.CS.cruise_enabled_neg_accel_ramp_bp, CI.CS.cruise_enabled_neg_accel_ramp_v,
+                                  CarInterface._ACCEL_MIN, CarInterface._ACCEL_MAX)
 
-  # Volt determined by iteratively plotting and minimizing error for f(angle, speed) = steer.
-  @staticmethod
-  def get_steer_feedforward_volt(desired_angle, v_ego):
-    # maps [-inf,inf] to [-1,1]: sigmoid(34.4 deg) = sigmoid(1) = 0.5
-    # 1 / 0.02904609 = 34.4 deg ~= 36 deg ~= 1/10 circle? Arbitrary?
-    desired_angle *= 0.02904609
-    sigmoid = desired_angle / (1 + fabs(desired_angle))
-    return 0.10006696 * sigmoid * (v_ego + 3.12485927)
-
-  @staticmethod
-  def get_steer_feedforward_acadia(desired_angle, v_ego):
-    desired_angle *= 0.09760208
-    sigmoid = desired_angle / (1 + fabs(desired_angle))
-    return 0.04689655 * sigmoid * (v_ego + 10.028217)
+  # kept as staticmethods for existing callers; the implementations live at module level
+  get_steer_feedforward_volt = staticmethod(get_steer_feedforward_volt)
+  get_steer_feedforward_acadia = staticmethod(get_steer_feedforward_acadia)
 
   def get_steer_feedforward_function(self):
-    if self.CP.carFingerprint == CAR.VOLT:
-      return self.get_steer_feedforward_volt
-    elif self.CP.carFingerprint == CAR.ACADIA:
-      return self.get_steer_feedforward_acadia
-    else:
-      return CarInterfaceBase.get_steer_feedforward_default
+    # resolved once in __init__; the lateral controller calls the plain module-level function
+    return self._steer_ff
 
   @staticmethod
   def get_params(candidate, fingerprint=gen_empty_fingerprint(), car_fw=None):
+    fingerprint_key = tuple(sorted((bus, tuple(sorted(msgs.items()))) for bus, msgs in fingerprint.items()))
+    # callers fill in more fields afterwards, so always hand out a fresh copy
+    return _get_params_cached(candidate, fingerprint_key).as_builder()
+
+  @staticmethod
+  def _build_params(candidate, fingerprint):
     ret = CarInterfaceBase.get_std_params(candidate, fingerprint)
     ret.carName = "gm"
     ret.safetyModel = car.CarParams.SafetyModel.gm
@@ -128,98 +279,9 @@ class CarInterface(CarInterfaceBase):
     ret.longitudinalTuning.kiBP = [0.]
     ret.longitudinalTuning.kiV = [0.36]
 
-    if candidate == CAR.VOLT:
-      # supports stop and go, but initial engage must be above 18mph (which include conservatism)
-      ret.minEnableSpeed = -1
-      ret.mass = 1607. + STD_CARGO_KG
-      ret.wheelbase = 2.69
-      ret.steerRatio = 17.7  # Stock 15.7, LiveParameters
-      ret.steerRateCost = 1.0
-      tire_stiffness_factor = 0.469 # Stock Michelin Energy Saver A/S, LiveParameters
-      ret.steerRatioRear = 0.
-      ret.centerToFront = 0.45 * ret.wheelbase # from Volt Gen 1
-
-      ret.lateralTuning.pid.kpBP = [0., 40.]
-      ret.lateralTuning.pid.kpV = [0.0, .20]
-      ret.lateralTuning.pid.kiBP = [0.0]
-      ret.lateralTuning.pid.kiV = [0.02]
-      ret.lateralTuning.pid.kdBP = [i * CV.MPH_TO_MS for i in [15., 30., 55.]]
-      ret.lateralTuning.pid.kdV = [0.1, 0.25, 0.3]
-      ret.lateralTuning.pid.kf = 1. # !!! ONLY for sigmoid feedforward !!!
-      ret.steerActuatorDelay = 0.2
-
-      # Only tuned to reduce oscillations. TODO.
-      ret.longitudinalTuning.kpV = [1.7, 1.3]
-      ret.longitudinalTuning.kiV = [0.34]
-      ret.longitudinalTuning.kdV = [1.2, 0.2]
-      ret.longitudinalTuning.kdBP = [5., 25.]
-
-    elif candidate == CAR.MALIBU:
-      # supports stop and go, but initial engage must be above 18mph (which include conservatism)
-      ret.minEnableSpeed = 18 * CV.MPH_TO_MS
-      ret.mass = 1496. + STD_CARGO_KG
-      ret.wheelbase = 2.83
-      ret.steerRatio = 15.8
-      ret.steerRatioRear = 0.
-      ret.centerToFront = ret.wheelbase * 0.4  # wild guess
-
-    elif candidate == CAR.HOLDEN_ASTRA:
-      ret.mass = 1363. + STD_CARGO_KG
-      ret.wheelbase = 2.662
-      # Remaining parameters copied from Volt for now
-      ret.centerToFront = ret.wheelbase * 0.4
-      ret.minEnableSpeed = 18 * CV.MPH_TO_MS
-      ret.steerRatio = 15.7
-      ret.steerRatioRear = 0.
-
-    elif candidate == CAR.ACADIA:
-      ret.minEnableSpeed = -1.  # engage speed is decided by pcm
-      ret.mass = 4353 * CV.LB_TO_KG + STD_CARGO_KG # from vin decoder
-      ret.wheelbase = 2.86 # Confirmed from vin decoder
-      ret.steerRatio = 14.4  # end to end is 13.46 - seems to be undocumented, using JYoung value
-      ret.steerRatioRear = 0.
-      ret.centerToFront = ret.wheelbase * 0.4
-      ret.lateralTuning.pid.kf = 1. # get_steer_feedforward_acadia()
-      ret.longitudinalTuning.kpV = [.19, .15]
-
-    elif candidate == CAR.BUICK_REGAL:
-      ret.minEnableSpeed = 18 * CV.MPH_TO_MS
-      ret.mass = 3779. * CV.LB_TO_KG + STD_CARGO_KG  # (3849+3708)/2
-      ret.wheelbase = 2.83  # 111.4 inches in meters
-      ret.steerRatio = 14.4  # guess for tourx
-      ret.steerRatioRear = 0.
-      ret.centerToFront = ret.wheelbase * 0.4  # guess for tourx
-
-    elif candidate == CAR.CADILLAC_ATS:
-      ret.minEnableSpeed = 18 * CV.MPH_TO_MS
-      ret.mass = 1601. + STD_CARGO_KG
-      ret.wheelbase = 2.78
-      ret.steerRatio = 15.3
-      ret.steerRatioRear = 0.
-      ret.centerToFront = ret.wheelbase * 0.49
-
-    elif candidate == CAR.ESCALADE:
-      ret.minEnableSpeed = -1.  # engage speed is decided by pcm
-      ret.mass = 2645. + STD_CARGO_KG
-      ret.wheelbase = 2.95
-      ret.steerRatio = 17.3  # end to end is 13.46
-      ret.steerRatioRear = 0.
-      ret.centerToFront = ret.wheelbase * 0.4
-      ret.lateralTuning.pid.kiBP, ret.lateralTuning.pid.kpBP = [[10., 41.0], [10., 41.0]]
-      ret.lateralTuning.pid.kpV, ret.lateralTuning.pid.kiV = [[0.13, 0.24], [0.01, 0.02]]
-      ret.lateralTuning.pid.kf = 0.000045
-      tire_stiffness_factor = 1.0
-
-    elif candidate == CAR.ESCALADE_ESV:
-      ret.minEnableSpeed = -1.  # engage speed is decided by pcm
-      ret.mass = 2739. + STD_CARGO_KG
-      ret.wheelbase = 3.302
-      ret.steerRatio = 17.3
-      ret.centerToFront = ret.wheelbase * 0.49
-      ret.lateralTuning.pid.kiBP, ret.lateralTuning.pid.kpBP = [[10., 41.0], [10., 41.0]]
-      ret.lateralTuning.pid.kpV, ret.lateralTuning.pid.kiV = [[0.13, 0.24], [0.01, 0.02]]
-      ret.lateralTuning.pid.kf = 0.000045
-      tire_stiffness_factor = 1.0
+    apply_car_params = _CAR_PARAM_APPLIERS.get(candidate)
+    if apply_car_params is not None:
+      tire_stiffness_factor = apply_car_params(ret, tire_stiffness_factor)
 
     # TODO: get actual value, for now starting with reasonable value for
     # civic and scaling by mass and wheelbase
@@ -231,13 +293,109 @@ class CarInterface(CarInterfaceBase):
     
     return ret
 
+  def _flush_pending_params(self):
+    for k, v in self._pending_params.items():
+      if k in _UI_WRITABLE_PARAMS or self._last_written.get(k) != v:
+        if isinstance(v, bool):
+          self.CS._params.put_bool(k, v)
+        else:
+          self.CS._params.put(k, v)
+        self._last_written[k] = v
+    self._pending_params.clear()
+
+  # distance button handlers in one-pedal mode
+  def _one_pedal_distance_pressed(self, t):
+    if not self.one_pedal_mode: # user pressed distance button while in coast-one-pedal mode, so turn on braking
+      cloudlog.info("button press event: Engaging one-pedal braking.")
+      self.CS.one_pedal_last_switch_to_friction_braking_t = t
+      self.CS.distance_button_last_press_t = t + 0.5
+      self.CS.one_pedal_brake_mode = 0
+      self.one_pedal_last_brake_mode = self.CS.one_pedal_brake_mode
+      self.CS.one_pedal_mode_enabled = True
+      self.CS.one_pedal_mode_active = True
+      self._pending_params["OnePedalBrakeMode"] = str(self.CS.one_pedal_brake_mode)
+      self._pending_params["OnePedalMode"] = self.CS.one_pedal_mode_enabled
+    elif (self.CS.pause_long_on_gas_press or self.CS.out.standstill) and t - self.CS.distance_button_last_press_t < 0.4 and t - self.CS.one_pedal_last_switch_to_friction_braking_t > 1.: # on the second press of a double tap while the gas is pressed, turn off one-pedal braking
+      # cycle the brake mode back to nullify the first press
+      cloudlog.info("button press event: Disengaging one-pedal mode with distace button double-press.")
+      self.CS.distance_button_last_press_t = t + 0.5
+      self.CS.one_pedal_brake_mode = 0
+      self.one_pedal_last_brake_mode = self.CS.one_pedal_brake_mode
+      self.CS.one_pedal_mode_enabled = False
+      self.CS.one_pedal_mode_active = False
+      self.CS.coast_one_pedal_mode_active = True
+      self._pending_params["OnePedalBrakeMode"] = str(self.CS.one_pedal_brake_mode)
+      self._pending_params["OnePedalMode"] = self.CS.one_pedal_mode_enabled
+    else:
+      self.CS.distance_button_last_press_t = t
+      cloudlog.info("button press event: Distance button pressed in one-pedal mode.")
+    self.CS.one_pedal_mode_engaged_with_button = False
+
+  def _one_pedal_distance_released(self, t):
+    if self.CS.one_pedal_mode_engaged_with_button and t - self.CS.distance_button_last_press_t < 0.8: #user just engaged one-pedal with distance button hold and immediately let off the button, so default to regen/engine braking. If they keep holding, it does hard braking
+      cloudlog.info("button press event: Engaging one-pedal mode with distance button.")
+      self.CS.one_pedal_brake_mode = 0
+      self.one_pedal_last_brake_mode = self.CS.one_pedal_brake_mode
+      self.CS.one_pedal_mode_enabled = False
+      self.CS.one_pedal_mode_active = False
+      self.CS.coast_one_pedal_mode_active = True
+      self._pending_params["OnePedalBrakeMode"] = str(self.CS.one_pedal_brake_mode)
+      self._pending_params["OnePedalMode"] = self.CS.one_pedal_mode_enabled
+      return
+    # only make changes when user lifts press
+    if self.CS.one_pedal_brake_mode == 2:
+      cloudlog.info("button press event: Disengaging one-pedal hard braking. Switching to moderate braking")
+      self.CS.one_pedal_brake_mode = 1
+      self._pending_params["OnePedalBrakeMode"] = str(self.CS.one_pedal_brake_mode)
+    elif t - self.CS.distance_button_last_press_t > 0. and t - self.CS.distance_button_last_press_t < 0.4: # only switch braking on a single tap (also allows for ignoring presses by setting last_press_t to be greater than t)
+      self.CS.one_pedal_brake_mode ^= 1 # 0 <-> 1; mode 2 is handled above
+      cloudlog.info(f"button press event: one-pedal braking. New value: {self.CS.one_pedal_brake_mode}")
+      self._pending_params["OnePedalBrakeMode"] = str(self.CS.one_pedal_brake_mode)
+    self.CS.one_pedal_mode_engaged_with_button = False
+
+  def _one_pedal_distance_held(self, t):
+    if t - self.CS.distance_button_last_press_t > 0.3:
+      if self.CS.one_pedal_brake_mode < 2:
+        cloudlog.info("button press event: Engaging one-pedal hard braking.")
+        self.one_pedal_last_brake_mode = self.CS.one_pedal_brake_mode
+      self.CS.one_pedal_brake_mode = 2
+
+  # distance button handlers in cruise, where it just modifies follow distance
+  def _cruise_distance_pressed(self, t):
+    self.CS.distance_button_last_press_t = t
+    cloudlog.info("button press event: Distance button pressed in cruise mode.")
+
+  def _cruise_distance_released(self, t): # apply change on button lift
+    self.CS.follow_level -= 1
+    if self.CS.follow_level < 1:
+      self.CS.follow_level = 3
+    self._pending_params["FollowLevel"] = str(self.CS.follow_level)
+    cloudlog.info("button press event: cruise follow distance button. new value: %r" % self.CS.follow_level)
+
+  def _cruise_distance_held(self, t):
+    if t - self.CS.distance_button_last_press_t > 0.5:
+      # user held follow button while in normal cruise, so engage one-pedal mode
+      cloudlog.info("button press event: distance button hold to engage one-pedal mode.")
+      self.CS.one_pedal_mode_engage_on_gas = True
+      self.CS.one_pedal_mode_engaged_with_button = True
+      self.CS.distance_button_last_press_t = t + 0.2 # gives the user X+0.3 seconds to release the distance button before hard braking is applied (which they may want, so don't want too long of a delay)
+
+  _DISTANCE_HANDLERS = {
+    _DB_ONE_PEDAL | _DB_CHANGED | _DB_PRESSED: _one_pedal_distance_pressed,
+    _DB_ONE_PEDAL | _DB_CHANGED: _one_pedal_distance_released,
+    _DB_ONE_PEDAL | _DB_PRESSED: _one_pedal_distance_held,
+    _DB_CHANGED | _DB_PRESSED: _cruise_distance_pressed,
+    _DB_CHANGED: _cruise_distance_released,
+    _DB_PRESSED: _cruise_distance_held,
+  }
+
   # returns a car.CarState
   def update(self, c, can_strings):
     self.cp.update_strings(can_strings)
 
     ret = self.CS.update(self.cp)
 
-    t = sec_since_boot()
+    t = self.CS.t  # timestamp taken by CS.update() for this tick
 
     cruiseEnabled = self.CS.pcm_acc_status != AccState.OFF
     ret.cruiseState.enabled = cruiseEnabled
@@ -248,7 +406,8 @@ class CarInterface(CarInterfaceBase):
 
     ret.engineRPM = self.CS.engineRPM
 
-    buttonEvents = []
+    # ret is a fresh CarState with an empty buttonEvents list, so only fill it in on a change
+    buttonEvents = ()
 
     if self.CS.cruise_buttons != self.CS.prev_cruise_buttons and self.CS.prev_cruise_buttons != CruiseButtons.INIT:
       be = car.CarState.ButtonEvent.new_message()
@@ -270,9 +429,8 @@ class CarInterface(CarInterfaceBase):
         be.type = ButtonType.cancel
       elif but == CruiseButtons.MAIN:
         be.type = ButtonType.altButton3
-      buttonEvents.append(be)
-
-    ret.buttonEvents = buttonEvents
+      buttonEvents = [be]
+      ret.buttonEvents = buttonEvents
 
     if cruiseEnabled and self.CS.lka_button and self.CS.lka_button != self.CS.prev_lka_button:
       self.CS.lkMode = not self.CS.lkMode
@@ -280,85 +438,20 @@ class CarInterface(CarInterfaceBase):
     
     if t - self.params_check_last_t >= self.params_check_freq:
       self.params_check_last_t = t
-      self.one_pedal_mode = self.CS._params.get_bool("OnePedalMode")
+      self.one_pedal_mode = self.CS.param_watcher.get_bool("OnePedalMode")
 
     # distance button is also used to toggle braking modes when in one-pedal-mode
-    if self.CS.one_pedal_mode_active or self.CS.coast_one_pedal_mode_active:
-      if self.CS.distance_button != self.CS.prev_distance_button:
-        if not self.CS.distance_button and self.CS.one_pedal_mode_engaged_with_button and t - self.CS.distance_button_last_press_t < 0.8: #user just engaged one-pedal with distance button hold and immediately let off the button, so default to regen/engine braking. If they keep holding, it does hard braking
-          cloudlog.info("button press event: Engaging one-pedal mode with distance button.")
-          self.CS.one_pedal_brake_mode = 0
-          self.one_pedal_last_brake_mode = self.CS.one_pedal_brake_mode
-          self.CS.one_pedal_mode_enabled = False
-          self.CS.one_pedal_mode_active = False
-          self.CS.coast_one_pedal_mode_active = True
-          tmp_params = Params()
-          tmp_params.put("OnePedalBrakeMode", str(self.CS.one_pedal_brake_mode))
-          tmp_params.put_bool("OnePedalMode", self.CS.one_pedal_mode_enabled)
-        else:
-          if not self.one_pedal_mode and self.CS.distance_button: # user lifted press of distance button while in coast-one-pedal mode, so turn on braking
-            cloudlog.info("button press event: Engaging one-pedal braking.")
-            self.CS.one_pedal_last_switch_to_friction_braking_t = t
-            self.CS.distance_button_last_press_t = t + 0.5
-            self.CS.one_pedal_brake_mode = 0
-            self.one_pedal_last_brake_mode = self.CS.one_pedal_brake_mode
-            self.CS.one_pedal_mode_enabled = True
-            self.CS.one_pedal_mode_active = True
-            tmp_params = Params()
-            tmp_params.put("OnePedalBrakeMode", str(self.CS.one_pedal_brake_mode))
-            tmp_params.put_bool("OnePedalMode", self.CS.one_pedal_mode_enabled)
-          elif self.CS.distance_button and (self.CS.pause_long_on_gas_press or self.CS.out.standstill) and t - self.CS.distance_button_last_press_t < 0.4 and t - self.CS.one_pedal_last_switch_to_friction_braking_t > 1.: # on the second press of a double tap while the gas is pressed, turn off one-pedal braking
-            # cycle the brake mode back to nullify the first press
-            cloudlog.info("button press event: Disengaging one-pedal mode with distace button double-press.")
-            self.CS.distance_button_last_press_t = t + 0.5
-            self.CS.one_pedal_brake_mode = 0
-            self.one_pedal_last_brake_mode = self.CS.one_pedal_brake_mode
-            self.CS.one_pedal_mode_enabled = False
-            self.CS.one_pedal_mode_active = False
-            self.CS.coast_one_pedal_mode_active = True
-            tmp_params = Params()
-            tmp_params.put("OnePedalBrakeMode", str(self.CS.one_pedal_brake_mode))
-            tmp_params.put_bool("OnePedalMode", self.CS.one_pedal_mode_enabled)
-          else:
-            if self.CS.distance_button:
-              self.CS.distance_button_last_press_t = t
-              cloudlog.info("button press event: Distance button pressed in one-pedal mode.")
-            else: # only make changes when user lifts press
-              if self.CS.one_pedal_brake_mode == 2:
-                cloudlog.info("button press event: Disengaging one-pedal hard braking. Switching to moderate braking")
-                self.CS.one_pedal_brake_mode = 1
-                tmp_params = Params()
-                tmp_params.put("OnePedalBrakeMode", str(self.CS.one_pedal_brake_mode))
-              elif t - self.CS.distance_button_last_press_t > 0. and t - self.CS.distance_button_last_press_t < 0.4: # only switch braking on a single tap (also allows for ignoring presses by setting last_press_t to be greater than t)
-                self.CS.one_pedal_brake_mode = (self.CS.one_pedal_brake_mode + 1) % 2
-                cloudlog.info(f"button press event: one-pedal braking. New value: {self.CS.one_pedal_brake_mode}")
-                tmp_params = Params()
-                tmp_params.put("OnePedalBrakeMode", str(self.CS.one_pedal_brake_mode))
-          self.CS.one_pedal_mode_engaged_with_button = False
-      elif self.CS.distance_button and t - self.CS.distance_button_last_press_t > 0.3:
-        if self.CS.one_pedal_brake_mode < 2:
-          cloudlog.info("button press event: Engaging one-pedal hard braking.")
-          self.one_pedal_last_brake_mode = self.CS.one_pedal_brake_mode
-        self.CS.one_pedal_brake_mode = 2
+    one_pedal = self.CS.one_pedal_mode_active or self.CS.coast_one_pedal_mode_active
+    distance_key = (_DB_ONE_PEDAL if one_pedal else 0) \
+                   | (_DB_CHANGED if self.CS.distance_button != self.CS.prev_distance_button else 0) \
+                   | (_DB_PRESSED if self.CS.distance_button else 0)
+    handler = self._DISTANCE_HANDLERS.get(distance_key)
+    if handler is not None:
+      handler(self, t)
+      if self._pending_params:
+        self._flush_pending_params()
+    if one_pedal:
       self.CS.follow_level = self.CS.one_pedal_brake_mode + 1
-    else: # cruis is active, so just modify follow distance
-      if self.CS.distance_button != self.CS.prev_distance_button:
-        if self.CS.distance_button:
-          self.CS.distance_button_last_press_t = t
-          cloudlog.info("button press event: Distance button pressed in cruise mode.")
-        else: # apply change on button lift
-          self.CS.follow_level -= 1
-          if self.CS.follow_level < 1:
-            self.CS.follow_level = 3
-          tmp_params = Params()
-          tmp_params.put("FollowLevel", str(self.CS.follow_level))
-          cloudlog.info("button press event: cruise follow distance button. new value: %r" % self.CS.follow_level)
-      elif self.CS.distance_button and t - self.CS.distance_button_last_press_t > 0.5 and not (self.CS.one_pedal_mode_active or self.CS.coast_one_pedal_mode_active):
-          # user held follow button while in normal cruise, so engage one-pedal mode
-          cloudlog.info("button press event: distance button hold to engage one-pedal mode.")
-          self.CS.one_pedal_mode_engage_on_gas = True
-          self.CS.one_pedal_mode_engaged_with_button = True
-          self.CS.distance_button_last_press_t = t + 0.2 # gives the user X+0.3 seconds to release the distance button before hard braking is applied (which they may want, so don't want too long of a delay)
 
     ret.readdistancelines = self.CS.follow_level
 
@@ -373,36 +466,41 @@ class CarInterface(CarInterfaceBase):
     steer_paused = False
     if cruiseEnabled:
       if t - self.CS.last_pause_long_on_gas_press_t < 0.5 and t - self.CS.sessionInitTime > 10.:
-        events.add(car.CarEvent.EventName.pauseLongOnGasPress)
+        events.add(EventName.pauseLongOnGasPress)
       if not ret.standstill and self.CS.lkMode and self.CS.lane_change_steer_factor < 1.:
-        events.add(car.CarEvent.EventName.blinkerSteeringPaused)
+        events.add(EventName.blinkerSteeringPaused)
         steer_paused = True
     if ret.vEgo < self.CP.minSteerSpeed:
       if ret.standstill and cruiseEnabled and not ret.brakePressed and not self.CS.pause_long_on_gas_press and not self.CS.autoHoldActivated and not self.CS.disengage_on_gas and t - self.CS.sessionInitTime > 10.:
-        events.add(car.CarEvent.EventName.stoppedWaitForGas)
+        events.add(EventName.stoppedWaitForGas)
       elif not steer_paused and self.CS.lkMode:
-        events.add(car.CarEvent.EventName.belowSteerSpeed)
+        events.add(EventName.belowSteerSpeed)
     if self.CS.autoHoldActivated:
       self.CS.lastAutoHoldTime = t
-      events.add(car.CarEvent.EventName.autoHoldActivated)
+      events.add(EventName.autoHoldActivated)
     if self.CS.pcm_acc_status == AccState.FAULTED and t - self.CS.sessionInitTime > 10.0 and t - self.CS.lastAutoHoldTime > 1.0:
       events.add(EventName.accFaulted)
 
-    # handle button presses
-    for b in ret.buttonEvents:
+    # handle button presses; at most one cruise button event is generated per tick
+    if buttonEvents:
+      b = buttonEvents[0]
       # do enable on both accel and decel buttons
       # The ECM will fault if resume triggers an enable while speed is set to 0
-      if b.type == ButtonType.accelCruise and c.hudControl.setSpeed > 0 and c.hudControl.setSpeed < 70 and not b.pressed:
-        events.add(EventName.buttonEnable)
-      if b.type == ButtonType.decelCruise and not b.pressed:
-        events.add(EventName.buttonEnable)
+      if b.type == ButtonType.accelCruise:
+        if c.hudControl.setSpeed > 0 and c.hudControl.setSpeed < 70 and not b.pressed:
+          events.add(EventName.buttonEnable)
+      elif b.type == ButtonType.decelCruise:
+        if not b.pressed:
+          events.add(EventName.buttonEnable)
       # do disable on button down
-      if b.type == ButtonType.cancel and b.pressed:
-        events.add(EventName.buttonCancel)
+      elif b.type == ButtonType.cancel:
+        if b.pressed:
+          events.add(EventName.buttonCancel)
       # The ECM independently tracks a ‘speed is set’ state that is reset on main off.
       # To keep controlsd in sync with the ECM state, generate a RESET_V_CRUISE event on main cruise presses.
-      if b.type == ButtonType.altButton3 and b.pressed:
-        events.add(EventName.buttonMainCancel)
+      elif b.type == ButtonType.altButton3:
+        if b.pressed:
+          events.add(EventName.buttonMainCancel)
 
     ret.events = events.to_msg()
 
@@ -419,7 +517,7 @@ class CarInterface(CarInterfaceBase):
     # For Openpilot, "enabled" includes pre-enable.
     # In GM, PCM faults out if ACC command overlaps user gas, so keep that from happening inside CC.update().
     pause_long_on_gas_press = c.enabled and self.CS.gasPressed and not self.CS.out.brake > 0. and not self.disengage_on_gas
-    t = sec_since_boot()
+    t = self.CS.t  # apply() runs right after update() in controlsd
     self.CS.one_pedal_mode_engage_on_gas = False
     if pause_long_on_gas_press and not self.CS.pause_long_on_gas_press:
       self.CS.one_pedal_mode_engage_on_gas = (self.CS.one_pedal_mode_engage_on_gas_enabled and self.CS.vEgo >= self.CS.one_pedal_mode_engage_on_gas_min_speed and not self.CS.one_pedal_mode_active and not self.CS.coast_one_pedal_mode_active)
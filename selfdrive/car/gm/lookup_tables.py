@@ -0,0 +1,43 @@
+from bisect import bisect_left
+from selfdrive.config import Conversions as CV
+from selfdrive.controls.lib.longitudinal_planner import _A_CRUISE_MAX_BP, _A_CRUISE_MAX_V
+
+_MPH = CV.MPH_TO_MS
+
+# revert to stock max negative accel based on relative lead velocity
+_A_MIN_V_STOCK_FACTOR_BP = (-5. * _MPH, 1. * _MPH)
+_A_MIN_V_STOCK_FACTOR_V = (0., 1.)
+
+# increase/decrease max accel based on vehicle pitch
+INCLINE_ACCEL_SCALE_BP = (25. * _MPH, 45. * _MPH) # [mph] lookup speeds for additional offset
+INCLINE_ACCEL_SCALE_V = (1.2, 1.05) # [m/s^2] additional scale factor to change how incline affects accel based on speed
+
+class Idx:
+  MIN_V_STOCK_FACTOR = 0
+  INCLINE_ACCEL_SCALE = 1
+  CRUISE_MAX = 2
+
+# all breakpoint and value tables, stored as two parallel tables of tuples indexed by Idx
+BP = (
+  _A_MIN_V_STOCK_FACTOR_BP,
+  INCLINE_ACCEL_SCALE_BP,
+  tuple(_A_CRUISE_MAX_BP),
+)
+V = (
+  _A_MIN_V_STOCK_FACTOR_V,
+  INCLINE_ACCEL_SCALE_V,
+  tuple(_A_CRUISE_MAX_V),
+)
+
+def interp_scalar(x, xp, fp):
+  # scalar-only equivalent of numpy_fast.interp for a sorted breakpoint tuple
+  hi = bisect_left(xp, x)
+  if hi == 0:
+    return fp[0]
+  if hi == len(xp):
+    return fp[-1]
+  lo = hi - 1
+  return fp[lo] + (x - xp[lo]) * (fp[hi] - fp[lo]) / (xp[hi] - xp[lo])
+
+def interp_idx(x, idx):
+  return interp_scalar(x, BP[idx], V[idx])
@@ -0,0 +1,34 @@
+#!/usr/bin/env python3
+import unittest
+
+from common.numpy_fast import interp
+from selfdrive.car.gm.lookup_tables import BP, V, interp_scalar
+
+
+class TestInterpScalar(unittest.TestCase):
+  def _check(self, xs, xp, fp):
+    for x in xs:
+      self.assertEqual(interp_scalar(x, xp, fp), interp(x, xp, fp), f"x={x} xp={xp} fp={fp}")
+
+  def test_matches_interp(self):
+    xp = (0., 5., 10., 20., 40.)
+    fp = (-1.0, -.8, -.67, -.5, -.30)
+    # before the first breakpoint, at and between breakpoints, and past the last one
+    xs = [-10., -1e-12, 0., 2.5, 5., 7., 10., 15.2, 20., 39.999999, 40., 40.000001, 100.]
+    self._check(xs, xp, fp)
+
+  def test_repeated_breakpoints(self):
+    xs = [-1., 0., 0.5, 1., 1.5, 2., 3.]
+    self._check(xs, (0., 1., 1., 2.), (0., 1., 3., 4.))
+    self._check(xs, (0., 0., 2.), (5., 1., 3.))
+    self._check(xs, (0., 2., 2.), (1., 3., 5.))
+
+  def test_lookup_tables(self):
+    for xp, fp in zip(BP, V):
+      lo, hi = xp[0], xp[-1]
+      xs = [lo - 1., hi + 1.] + [lo + (hi - lo) * i / 10. for i in range(11)] + list(xp)
+      self._check(xs, xp, fp)
+
+
+if __name__ == "__main__":
+  unittest.main()
@@ -15,6 +15,8 @@
 #include <cstring>
 #include <mutex>
 #include <unordered_map>
+#include <utility>
+#include <vector>
 
 #include "selfdrive/common/swaglog.h"
 #include "selfdrive/common/util.h"
@@ -311,6 +313,55 @@ int Params::put(const char* key, const char* value, size_t value_size) {
   return result;
 }
 
+int Params::putMany(const std::map<std::string, std::string> &values) {
+  // Same steps as put(), but every value is moved into place under a single
+  // lock and the containing directory is only fsynced once.
+  std::vector<std::pair<std::string, std::string>> tmp_paths;  // (temp path, key)
+  int result = 0;
+  for (auto &[key, value] : values) {
+    std::string tmp_path = params_path + "/.tmp_value_XXXXXX";
+    int tmp_fd = mkstemp((char*)tmp_path.c_str());
+    if (tmp_fd < 0) {
+      result = -1;
+      break;
+    }
+    tmp_paths.push_back({tmp_path, key});
+
+    // Write value to temp and fsync to force persist the changes.
+    ssize_t bytes_written = HANDLE_EINTR(write(tmp_fd, value.data(), value.size()));
+    if (bytes_written < 0 || (size_t)bytes_written != value.size()) {
+      result = -20;
+    } else {
+      result = fsync(tmp_fd);
+    }
+    close(tmp_fd);
+    if (result < 0) break;
+  }
+
+  if (result == 0 && !tmp_paths.empty()) {
+    FileLock file_lock(params_path + "/.lock", LOCK_EX);
+    std::lock_guard<FileLock> lk(file_lock);
+
+    // Move temps into place.
+    for (auto &[tmp_path, key] : tmp_paths) {
+      std::string path = params_path + "/d/" + key;
+      if ((result = rename(tmp_path.c_str(), path.c_str())) < 0) break;
+    }
+
+    // fsync parent directory
+    std::string path = params_path + "/d";
+    int result_sync = fsync_dir(path.c_str());
+    if (result == 0) {
+      result = result_sync;
+    }
+  }
+
+  for (auto &[tmp_path, key] : tmp_paths) {
+    ::unlink(tmp_path.c_str());
+  }
+  return result;
+}
+
 int Params::remove(const char *key) {
   FileLock file_lock(params_path + "/.lock", LOCK_EX);
   std::lock_guard<FileLock> lk(file_lock);
@@ -78,6 +78,9 @@ public:
     return putBool(key.c_str(), val);
   }
 
+  // write several values, taking the lock and fsyncing the directory only once
+  int putMany(const std::map<std::string, std::string> &values);
+
 private:
   const std::string params_path;
 };
@@ -58,7 +58,7 @@ def calc_cruise_accel_limits(v_ego, following, accelMode):
   else:
     a_cruise_min = interp(v_ego, _A_CRUISE_MIN_BP, _A_CRUISE_MIN_V_MODE_LIST[accelMode])
     a_cruise_max = interp(v_ego, _A_CRUISE_MAX_BP, _A_CRUISE_MAX_V_MODE_LIST[accelMode])
-  return [a_cruise_min, a_cruise_max]
+  return a_cruise_min, a_cruise_max
 
 
 
@@ -4,12 +4,15 @@ import os
 import signal
 import subprocess
 import sys
+import threading
 import traceback
 
 import cereal.messaging as messaging
 import selfdrive.crash as crash
 from common.basedir import BASEDIR
 from common.params import Params, ParamKeyType
+from common.params_watcher import ParamWatcher
+from common.realtime import sec_since_boot
 from common.text_window import TextWindow
 from selfdrive.boardd.set_time import set_time
 from selfdrive.hardware import HARDWARE, PC
@@ -24,6 +27,9 @@ from selfdrive.version import dirty, get_git_commit, version, origin, branch, co
 
 sys.path.append(os.path.join(BASEDIR, "pyextra"))
 
+bootlog_proc = None
+
+
 def manager_init():
 
   # update system time from panda
@@ -89,9 +95,8 @@ def manager_init():
     params.put_bool("RecordFront", True)
 
   # set unset params
-  for k, v in default_params:
-    if params.get(k) is None:
-      params.put(k, v)
+  existing_params = params.get_keys()
+  params.put_many({k: v for k, v in default_params if k not in existing_params})
 
   # parameters set by Enviroment Varables
   if os.getenv("HANDSMONITORING") is not None:
@@ -113,12 +118,14 @@ def manager_init():
     print("WARNING: failed to make /dev/shm")
 
   # set version params
-  params.put("Version", version)
-  params.put("TermsVersion", terms_version)
-  params.put("TrainingVersion", training_version)
-  params.put("GitCommit", get_git_commit(default=""))
-  params.put("GitBranch", get_git_branch(default=""))
-  params.put("GitRemote", get_git_remote(default=""))
+  params.put_many({
+    "Version": version,
+    "TermsVersion": terms_version,
+    "TrainingVersion": training_version,
+    "GitCommit": get_git_commit(default=""),
+    "GitBranch": get_git_branch(default=""),
+    "GitRemote": get_git_remote(default=""),
+  })
 
   # set dongle id
   reg_res = register(show_spinner=True)
@@ -132,6 +139,10 @@ def manager_init():
   if not dirty:
     os.environ['CLEAN'] = '1'
 
+  # msgq is the native transport on device, make a ZMQ override visible in the logs
+  if not PC and os.getenv("ZMQ") is not None:
+    cloudlog.warning("ZMQ set on device, managerState and all services will use zmq instead of msgq")
+
   cloudlog.bind_global(dongle_id=dongle_id, version=version, dirty=dirty,
                        device=HARDWARE.get_device_type())
 
@@ -151,17 +162,33 @@ def manager_cleanup():
   for p in managed_processes.values():
     p.stop()
 
+  if bootlog_proc is not None:
+    try:
+      bootlog_proc.wait(timeout=5)
+    except subprocess.TimeoutExpired:
+      cloudlog.warning("bootlog still running, killing")
+      bootlog_proc.kill()
+      bootlog_proc.wait()
+
   cloudlog.info("everything is dead")
 
 
+def sync_and_signal(proc, sig):
+  os.sync()
+  proc.signal(sig)
+
+
 def manager_thread():
   cloudlog.info("manager start")
   cloudlog.info({"environ": os.environ})
 
-  # save boot log
-  subprocess.call("./bootlog", cwd=os.path.join(BASEDIR, "selfdrive/loggerd"))
+  # save boot log, nothing below depends on it so don't wait for it here
+  global bootlog_proc
+  bootlog_proc = subprocess.Popen("./bootlog", cwd=os.path.join(BASEDIR, "selfdrive/loggerd"),
+                                  stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
 
   params = Params()
+  param_watcher = ParamWatcher(["IsDriverViewEnabled", "DoUninstall"], params)
 
   ignore = []
   if params.get("DongleId", encoding='utf8') == UNREGISTERED_DONGLE_ID:
@@ -171,12 +198,25 @@ def manager_thread():
   if os.getenv("BLOCK") is not None:
     ignore += os.getenv("BLOCK").split(",")
 
-  ensure_running(managed_processes.values(), started=False, not_run=ignore)
+  # the set of managed processes is fixed, snapshot it once for the loop
+  procs = list(managed_processes.values())
+  names = [p.name for p in procs]
+  updated_proc = managed_processes.get('updated')
+
+  ensure_running(procs, started=False, not_run=ignore)
 
   started_prev = False
   sm = messaging.SubMaster(['deviceState'])
   pm = messaging.PubMaster(['managerState'])
 
+  # managerState is built once and refilled in place every tick
+  msg = messaging.new_message('managerState')
+  processes = msg.managerState.init('processes', len(procs))
+  process_states = [processes[i] for i in range(len(procs))]
+  for name, state in zip(names, process_states):
+    state.name = name
+  proc_states = list(zip(procs, process_states))
+
   while True:
     sm.update()
     not_run = ignore[:]
@@ -185,28 +225,31 @@ def manager_thread():
       not_run.append("loggerd")
 
     started = sm['deviceState'].started
-    driverview = params.get_bool("IsDriverViewEnabled")
-    ensure_running(managed_processes.values(), started, driverview, not_run)
+    driverview = param_watcher.get_bool("IsDriverViewEnabled")
+    ensure_running(procs, started, driverview, not_run)
 
     # trigger an update after going offroad
-    if started_prev and not started and 'updated' in managed_processes:
-      os.sync()
-      managed_processes['updated'].signal(signal.SIGHUP)
+    if started_prev and not started and updated_proc is not None:
+      # sync can stall for a while on eMMC, keep it off the manager loop
+      threading.Thread(target=sync_and_signal, args=(updated_proc, signal.SIGHUP), daemon=True).start()
 
     started_prev = started
 
-    running_list = ["%s%s\u001b[0m" % ("\u001b[32m" if p.proc.is_alive() else "\u001b[31m", p.name)
-                    for p in managed_processes.values() if p.proc]
+    # poll each process once per tick, the debug line reuses the state messages
+    for p, state in proc_states:
+      p.fill_process_state_msg(state)
+
+    running_list = ["%s%s\u001b[0m" % ("\u001b[32m" if state.running else "\u001b[31m", name)
+                    for p, name, state in zip(procs, names, process_states) if p.proc]
     cloudlog.debug(' '.join(running_list))
 
     # send managerState
-    msg = messaging.new_message('managerState')
-    msg.managerState.processes = [p.get_process_state_msg() for p in managed_processes.values()]
+    msg.logMonoTime = int(sec_since_boot() * 1e9)
     pm.send('managerState', msg)
 
     # TODO: let UI handle this
     # Exit main loop when uninstall is needed
-    if params.get_bool("DoUninstall"):
+    if param_watcher.get_bool("DoUninstall"):
       break
 
 
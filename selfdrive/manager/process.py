@@ -158,11 +158,19 @@ class ManagerProcess(ABC):
   def get_process_state_msg(self):
     state = log.ManagerState.ProcessState.new_message()
     state.name = self.name
+    self.fill_process_state_msg(state)
+    return state
+
+  def fill_process_state_msg(self, state):
+    # only touches fixed-size fields, so the same state can be refilled every tick without growing the message
     if self.proc:
       state.running = self.proc.is_alive()
       state.pid = self.proc.pid or 0
       state.exitCode = self.proc.exitcode or 0
-    return state
+    else:
+      state.running = False
+      state.pid = 0
+      state.exitCode = 0
 
 
 class NativeProcess(ManagerProcess):